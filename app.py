@@ -1,163 +1,654 @@
 import os
+import hmac
+import time
 import string
-import random
+import calendar
+import asyncio
 import secrets
+from functools import partial
 from datetime import datetime, timedelta
-from flask import (
-    Flask, render_template, request, redirect,
-    url_for, abort, Response, flash
+from quart import (
+    Quart, render_template, request, redirect,
+    url_for, abort, Response, flash, session, make_response
 )
-from pymongo import MongoClient, ASCENDING
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from cachetools import LRUCache, TTLCache
+try:
+    from compression import zstd
+except ImportError:  # Python < 3.14
+    from backports import zstd
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, UpdateOne
+from pymongo.write_concern import WriteConcern
+from bson.binary import Binary
 from bson.objectid import ObjectId
+from pymongo.errors import (
+    BulkWriteError, ConnectionFailure, OperationFailure, ServerSelectionTimeoutError
+)
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from werkzeug.security import check_password_hash
 
 load_dotenv()
 
-app = Flask(__name__)
+app = Quart(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "dev-key")
+# Templates never change at runtime; skip the per-render mtime check
+app.config["TEMPLATES_AUTO_RELOAD"] = False
+# Reject oversized posts before the form body is buffered and parsed
+app.config["MAX_CONTENT_LENGTH"] = 1 * 1024 * 1024
 
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/pastebin")
 BASE_URL = os.getenv("BASE_URL", "http://localhost:5000")
 
-# Configure MongoDB client with connection pooling for better performance
-client = MongoClient(
+# Async MongoDB client so handlers await I/O instead of parking a worker thread.
+# Wire compression negotiates the first compressor the server supports;
+# zstd needs MongoDB >= 4.2 and, before Python 3.14, the backports.zstd
+# package (pymongo does not use zstandard); zlib is the fallback.
+# snappy is left out since python-snappy is not a dependency.
+client = AsyncIOMotorClient(
     MONGODB_URI,
-    maxPoolSize=50,
-    minPoolSize=10,
-    maxIdleTimeMS=45000,
+    maxPoolSize=200,
+    minPoolSize=20,
+    maxIdleTimeMS=300000,
     serverSelectionTimeoutMS=5000,
-    connectTimeoutMS=10000
+    connectTimeoutMS=10000,
+    compressors="zstd,zlib",
+    zlibCompressionLevel=-1,
+    retryWrites=True
 )
 db = client["pastebin"]
-pastes = db.pastes
+# Writes are acknowledged by the primary without waiting for replication or a
+# journal flush: a crash can lose the last few seconds of pastes, which is an
+# acceptable trade for a pastebin. w=0 is not used because the insert batcher
+# relies on acknowledged duplicate-key errors to regenerate colliding slugs.
+pastes = db.get_collection("pastes", write_concern=WriteConcern(w=1, j=False))
 
-# Create indexes for better query performance
-try:
-    pastes.create_index([("slug", ASCENDING)], unique=True, background=True)
-    pastes.create_index([("expires_at", ASCENDING)], background=True)
-    pastes.create_index([("created_at", ASCENDING)], background=True)
-except Exception as e:
-    # Use print for early startup logging before Flask app is fully initialized
-    print(f"Warning: Failed to create indexes: {e}")
+async def create_ttl_index():
+    """Let MongoDB delete pastes once expires_at passes (sweeps run every ~60s)."""
+    keys = [("expires_at", ASCENDING)]
+    try:
+        await pastes.create_index(keys, expireAfterSeconds=0, background=True)
+    except OperationFailure as e:
+        # IndexOptionsConflict: an older non-TTL index exists on expires_at
+        if e.code != 85:
+            raise
+        await pastes.drop_index(keys)
+        await pastes.create_index(keys, expireAfterSeconds=0, background=True)
+
+@app.before_serving
+async def create_indexes():
+    """Create indexes for better query performance."""
+    try:
+        await pastes.create_index([("slug", ASCENDING)], unique=True, background=True)
+        await create_ttl_index()
+        await pastes.create_index([("created_at", ASCENDING)], background=True)
+    except Exception as e:
+        app.logger.warning(f"Failed to create indexes: {e}")
+
+TEMPLATES = ["base.html", "index.html", "paste.html", "edit.html", "404.html", "error.html"]
+
+@app.before_serving
+async def precompile_templates():
+    """Compile every template up front so no request pays the parse cost."""
+    app.jinja_env.auto_reload = False
+    for name in TEMPLATES:
+        app.jinja_env.get_template(name)
 
 ALPHABET = string.ascii_letters + string.digits
 
+# Module-level bindings for hot-path callables, saving the attribute lookups
+_utcnow = datetime.utcnow
+_token_urlsafe = secrets.token_urlsafe
+
+# Paste inserts are coalesced into bulk_write batches of up to this many
+# documents, waiting at most this long for a batch to fill
+INSERT_BATCH_SIZE = 100
+INSERT_BATCH_DELAY = 0.005
+# Upper bound on how long a create waits for its batch to be written
+INSERT_TIMEOUT = 10
+
+_insert_queue = asyncio.Queue()
+_insert_worker_task = None
+
+# Per-process read cache of paste documents, one entry per slug holding a
+# (projection, paste) pair. Only pastes that can never change (no password)
+# are cached, so there is nothing to invalidate across worker processes;
+# editable pastes always hit MongoDB. The cache is bounded by the bytes of
+# content it holds (PASTE_CACHE_MB per worker), and pastes larger than
+# PASTE_CACHE_MAX_ITEM are never cached so one paste cannot flush the rest.
+# Handlers all run on one event loop, so no lock is needed.
+PASTE_CACHE_BYTES = int(os.getenv("PASTE_CACHE_MB", "64")) * 1024 * 1024
+PASTE_CACHE_MAX_ITEM = 256 * 1024
+# Rough per-entry cost of the dict and its small fields
+PASTE_CACHE_OVERHEAD = 1024
+
+def _cached_size(entry):
+    return len(entry[1].get("content") or b"") + PASTE_CACHE_OVERHEAD
+
+_paste_cache = LRUCache(maxsize=PASTE_CACHE_BYTES, getsizeof=_cached_size)
+
+# Cached projections and the cached entries that can serve them; "view"
+# holds every field of "raw", so a paste's content is only cached once
+CACHE_SERVES = {"raw": {"raw", "view"}, "view": {"view"}}
+
+# Computed server-side (MongoDB >= 4.4) so the hash never leaves the DB
+_EDITABLE = {"$or": [
+    {"$toBool": "$password_hash"},
+    {"$gt": ["$password_pending_until", "$$NOW"]},
+]}
+
+# Fields fetched per route, so large or sensitive fields are only decoded where
+# needed. "full" is used by the edit route, which needs password_hash.
+PROJECTIONS = {
+    "raw": {
+        "_id": 0, "content": 1, "encoding": 1,
+        "expires_at": 1, "expires_at_epoch": 1, "editable": _EDITABLE,
+    },
+    "view": {
+        "slug": 1, "title": 1, "language": 1, "content": 1, "encoding": 1,
+        "created_at": 1, "expires_at": 1, "expires_at_epoch": 1, "editable": _EDITABLE,
+    },
+    # Edit POST only needs what it verifies against and the fallbacks for the update
+    "auth": {
+        "password_hash": 1, "password_pending_until": 1, "title": 1, "language": 1,
+        "expires_at": 1, "expires_at_epoch": 1,
+    },
+    "full": None,
+}
+
+# Coarse wall clock in whole epoch seconds, refreshed once a second so the
+# read path compares ints instead of building a datetime per request
+_now_epoch = int(time.time())
+
+_background_tasks = []
+
+# In-flight password hash jobs for newly created pastes; held here so they are
+# not garbage collected and can be drained on shutdown. Each holds a plaintext
+# password, so at most MAX_PENDING_PASSWORD_HASHES exist; past that, create()
+# hashes on the request path.
+_password_tasks = set()
+MAX_PENDING_PASSWORD_HASHES = 32
+# A new paste is shown as editable while its hash is pending, for at most this
+# long. If the hash never lands (errors, crash) the paste then reads as not
+# editable instead of "still being set up" forever.
+PASSWORD_PENDING_TIMEOUT = 60
+PASSWORD_HASH_ATTEMPTS = 3
+
+# Each argon2 run allocates 64 MiB; cap how many run at once
+_kdf_slots = asyncio.Semaphore(os.cpu_count() or 4)
+
+# token_urlsafe emits base64url; fold its two symbols back into ALPHABET
+_URLSAFE_TO_ALPHABET = str.maketrans("-_", "AB")
+
 def gen_slug(n=7):
-    """Generate a cryptographically secure random slug using secrets module."""
-    return ''.join(secrets.choice(ALPHABET) for _ in range(n))
+    """Generate a cryptographically secure random slug from a single os.urandom call."""
+    return _token_urlsafe(n)[:n].translate(_URLSAFE_TO_ALPHABET)
 
-def get_paste_or_404(slug):
-    """Fetch a paste by slug with expiration check."""
-    paste = pastes.find_one({"slug": slug})
-    if not paste:
-        abort(404)
+# argon2id runs in native code; these parameters take ~20-30 ms per hash
+password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+
+def hash_password(password):
+    """Hash a paste password with argon2id."""
+    return password_hasher.hash(password)
+
+def verify_password(password_hash, password):
+    """Check a password against an argon2 hash or a legacy Werkzeug (pbkdf2/scrypt) hash."""
+    if not password_hash.startswith("$argon2"):
+        return check_password_hash(password_hash, password)
+    try:
+        return password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def password_needs_rehash(password_hash):
+    """True for legacy Werkzeug hashes and argon2 hashes with outdated parameters."""
+    if not password_hash.startswith("$argon2"):
+        return True
+    return password_hasher.check_needs_rehash(password_hash)
+
+# Recently verified edit passwords per (slug, password_hash), so repeated
+# edits compare an HMAC instead of re-running the KDF
+_verified_passwords = TTLCache(maxsize=1024, ttl=300)
+
+def password_digest(password):
+    """Keyed digest of a password; the plaintext is never kept in memory."""
+    return hmac.new(app.secret_key.encode(), password.encode("utf-8"), "sha256").digest()
+
+async def check_edit_password(slug, password_hash, password):
+    """Verify an edit password, skipping the KDF if it was verified recently."""
+    key = (slug, password_hash)
+    digest = password_digest(password)
+    cached = _verified_passwords.get(key)
+    if cached is not None and hmac.compare_digest(cached, digest):
+        return True
+    if not await run_kdf(verify_password, password_hash, password):
+        return False
+    _verified_passwords[key] = digest
+    return True
+
+async def run_blocking(func, *args):
+    """Run CPU-bound work (e.g. password hashing) off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
+
+async def run_kdf(func, *args):
+    """run_blocking() for password hashing/verification, bounded by _kdf_slots."""
+    async with _kdf_slots:
+        return await run_blocking(func, *args)
+
+async def insert_paste(paste):
+    """Queue a paste for batched insertion and wait until it is persisted.
+
+    Aborts with 503 if the insert worker is not running or the write does not
+    complete within INSERT_TIMEOUT, rather than waiting forever.
+    """
+    if _insert_worker_task is None or _insert_worker_task.done():
+        app.logger.error("Paste insert worker is not running")
+        abort(503)
+    paste.setdefault("_id", ObjectId())
+    future = asyncio.get_running_loop().create_future()
+    await _insert_queue.put((paste, future))
+    try:
+        await asyncio.wait_for(future, INSERT_TIMEOUT)
+    except asyncio.TimeoutError:
+        app.logger.error(f"Timed out inserting paste {paste['slug']}")
+        abort(503)
+
+def _resolve(future):
+    # The waiting request may have been cancelled (client disconnect) or timed out
+    if not future.done():
+        future.set_result(None)
+
+def _fail(future, exc):
+    if not future.done():
+        future.set_exception(exc)
+
+def _upsert(paste):
+    """Idempotent insert keyed on the client-side _id, timestamped by the server.
+
+    A slug collision still fails on the unique index, since the filter only
+    matches this paste's own _id. A retried write matches the already inserted
+    document, so only created_at moves forward to the retry time.
+    """
+    fields = {k: v for k, v in paste.items() if k != "_id"}
+    return UpdateOne(
+        {"_id": paste["_id"]},
+        {"$setOnInsert": fields, "$currentDate": {"created_at": True}},
+        upsert=True
+    )
+
+async def _write_batch(batch):
+    """Insert a batch of queued pastes, re-queueing any that hit a slug collision."""
+    try:
+        await pastes.bulk_write([_upsert(paste) for paste, _ in batch], ordered=False)
+    except BulkWriteError as e:
+        errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+        for i, (paste, future) in enumerate(batch):
+            err = errors.get(i)
+            if err is None:
+                _resolve(future)
+            elif err.get("code") == 11000 and not future.done():
+                paste["slug"] = gen_slug(7)
+                _insert_queue.put_nowait((paste, future))
+            else:
+                _fail(future, e)
+    except Exception as e:
+        for _, future in batch:
+            _fail(future, e)
+    else:
+        for _, future in batch:
+            _resolve(future)
+
+async def _insert_worker():
+    """Drain the insert queue, flushing every INSERT_BATCH_SIZE docs or INSERT_BATCH_DELAY seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _insert_queue.get()]
+        try:
+            deadline = loop.time() + INSERT_BATCH_DELAY
+            while len(batch) < INSERT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(_insert_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await _write_batch(batch)
+        except Exception as e:
+            # Never let one bad batch stop the worker; every later create would hang
+            app.logger.exception(f"Paste insert batch failed: {e}")
+            for _, future in batch:
+                _fail(future, e)
+
+async def _tick_clock():
+    """Refresh the coarse clock once a second."""
+    global _now_epoch
+    while True:
+        _now_epoch = int(time.time())
+        await asyncio.sleep(1)
+
+def to_epoch(dt):
+    """Convert a naive UTC datetime to integer epoch seconds."""
+    return calendar.timegm(dt.utctimetuple())
+
+@app.before_serving
+async def start_background_tasks():
+    global _insert_worker_task
+    _insert_worker_task = asyncio.create_task(_insert_worker())
+    _background_tasks.append(_insert_worker_task)
+    _background_tasks.append(asyncio.create_task(_tick_clock()))
+
+async def set_password_hash(paste_id, slug, password):
+    """Hash a new paste's password and store it, retrying with backoff.
+
+    Returns False if it could not be stored before the pending deadline; the
+    paste then ends up not editable.
+    """
+    for attempt in range(PASSWORD_HASH_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(2 ** (attempt - 1))
+        try:
+            password_hash = await run_kdf(hash_password, password)
+            result = await pastes.update_one(
+                {"_id": paste_id, "password_pending_until": {"$gt": _utcnow()}},
+                {"$set": {"password_hash": password_hash}, "$unset": {"password_pending_until": ""}}
+            )
+        except Exception as e:
+            app.logger.warning(f"Setting password for paste {slug} failed (attempt {attempt + 1}): {e}")
+            continue
+        if result.matched_count:
+            return True
+        app.logger.error(f"Password for paste {slug} landed after its pending deadline")
+        return False
+
+    app.logger.error(f"Giving up on setting password for paste {slug}")
+    try:
+        # Best effort; if this fails too the pending deadline resolves it
+        await pastes.update_one({"_id": paste_id}, {"$unset": {"password_pending_until": ""}})
+    except Exception:
+        pass
+    return False
+
+def schedule_password_hash(paste_id, slug, password):
+    task = asyncio.create_task(set_password_hash(paste_id, slug, password))
+    _password_tasks.add(task)
+    task.add_done_callback(_password_tasks.discard)
+
+@app.after_serving
+async def stop_background_tasks():
+    # Let pending password hashes land before the insert worker goes away
+    await asyncio.gather(*_password_tasks)
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+
+def invalidate_paste(slug):
+    """Drop a paste from the read cache."""
+    _paste_cache.pop(slug, None)
+
+# Paste content is stored zstd-compressed, using the same zstd module pymongo
+# uses for wire compression. The compressor is only used from the event loop
+# thread, so sharing one instance is safe. Decompression uses the one-shot
+# zstd.decompress(), because a ZstdDecompressor handles a single frame only.
+_compressor = zstd.ZstdCompressor(level=3)
+
+def encode_content(text):
+    """Return the stored fields for a paste's content."""
+    data = _compressor.compress(text.encode("utf-8"), mode=zstd.ZstdCompressor.FLUSH_FRAME)
+    return {"content": Binary(data), "encoding": "zstd"}
+
+def decode_content(paste):
+    """Return a paste's content as text, whether stored compressed or (legacy) plain."""
+    if paste.get("encoding") == "zstd":
+        return zstd.decompress(paste["content"]).decode("utf-8")
+    return paste["content"]
+
+def is_editable(paste):
+    """Whether a fetched paste, in any projection, can still change."""
+    return bool(
+        paste.get("editable") or paste.get("password_hash") or paste.get("password_pending_until")
+    )
+
+def cache_paste(slug, projection, paste):
+    """Store a fetched paste projection in the read cache if it can never change."""
+    # Pastes stored before expires_at_epoch existed get it filled in once here
+    if paste.get("expires_at") and "expires_at_epoch" not in paste:
+        paste["expires_at_epoch"] = to_epoch(paste["expires_at"])
+    if projection not in CACHE_SERVES or is_editable(paste):
+        return
+    entry = (projection, paste)
+    if _cached_size(entry) <= PASTE_CACHE_MAX_ITEM:
+        _paste_cache[slug] = entry
+
+def cached_paste(slug, projection):
+    """Return a cached paste that has every field of projection, or None."""
+    entry = _paste_cache.get(slug)
+    if entry is not None and entry[0] in CACHE_SERVES.get(projection, ()):
+        return entry[1]
+    return None
+
+async def get_paste_or_404(slug, projection="full"):
+    """Fetch a paste by slug (from the read cache when possible) with expiration check.
+
+    projection names an entry in PROJECTIONS limiting the fields returned.
+    """
+    paste = cached_paste(slug, projection)
+    if paste is None:
+        paste = await pastes.find_one({"slug": slug}, PROJECTIONS[projection])
+        if not paste:
+            abort(404)
+        cache_paste(slug, projection, paste)
     
-    # Check expiration with single datetime call
-    now = datetime.utcnow()
-    if paste.get("expires_at") and now > paste["expires_at"]:
-        pastes.delete_one({"_id": paste["_id"]})
+    # Check expiration against the coarse clock; the TTL index removes the
+    # document itself, this only hides it until the next sweep
+    if paste.get("expires_at_epoch") and _now_epoch > paste["expires_at_epoch"]:
+        invalidate_paste(slug)
         abort(404)
     return paste
 
+# Pastes without a password never change, so browsers and CDNs may cache them
+# for a year, or until they expire
+IMMUTABLE_MAX_AGE = 31536000
+
+def paste_etag(slug, expires_at_epoch, suffix=""):
+    """ETag for a non-editable paste; it embeds the expiry so a 304 needs no lookup."""
+    if expires_at_epoch:
+        return f"{slug}.{expires_at_epoch}{suffix}"
+    return f"{slug}{suffix}"
+
+def not_modified_response(slug, suffix=""):
+    """Answer If-None-Match against paste_etag() without touching MongoDB.
+
+    Returns a 304 carrying the same ETag and Cache-Control the 200 would have
+    had (the expiry comes from the matched tag), or None if nothing matched.
+    """
+    for etag in request.if_none_match.as_set():
+        tag = etag
+        if suffix:
+            if not tag.endswith(suffix):
+                continue
+            tag = tag[:-len(suffix)]
+        etag_slug, _, expiry = tag.partition(".")
+        if etag_slug != slug:
+            continue
+        if not expiry:
+            expires_at_epoch = None
+        elif expiry.isdigit() and int(expiry) >= _now_epoch:
+            expires_at_epoch = int(expiry)
+        else:
+            continue
+        response = Response("", status=304)
+        set_immutable_headers(response, etag, expires_at_epoch)
+        return response
+    return None
+
+def set_immutable_headers(response, etag, expires_at_epoch):
+    max_age = IMMUTABLE_MAX_AGE
+    if expires_at_epoch:
+        max_age = max(0, min(max_age, expires_at_epoch - _now_epoch))
+    response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+    response.set_etag(etag)
+
 @app.route("/", methods=["GET"])
-def index():
-    return render_template("index.html")
+async def index():
+    return await render_template("index.html")
 
 @app.route("/create", methods=["POST"])
-def create():
-    title = request.form.get("title", "")
-    language = request.form.get("language", "")
-    content = request.form.get("content", "")
-    expire_days = request.form.get("expire_days", type=int)
-    password = request.form.get("password", "")
+async def create():
+    form = await request.form
+    title = form.get("title", "")
+    language = form.get("language", "")
+    content = form.get("content", "")
+    expire_days = form.get("expire_days", type=int)
+    password = form.get("password", "")
 
     if not content.strip():
-        flash("Paste content cannot be empty", "error")
+        await flash("Paste content cannot be empty", "error")
         return redirect(url_for("index"))
 
-    # Optimized slug generation: generate cryptographically secure slug
-    # The probability of collision with secrets module is extremely low
-    # but we still check once for safety
+    # Collisions in a 62^7 keyspace are astronomically rare, so skip the
+    # pre-insert lookup; the batch writer regenerates the slug if the
+    # unique slug index rejects a duplicate
     slug = gen_slug(7)
-    
-    # Efficient existence check - count_documents is more efficient than find_one
-    if pastes.count_documents({"slug": slug}, limit=1):
-        slug = str(ObjectId())[:8]
 
-    # Single datetime call for consistency
-    now = datetime.utcnow()
-    
+    # created_at is set by the server when the paste is written
     paste = {
         "slug": slug,
         "title": title,
         "language": language,
-        "content": content,
-        "created_at": now,
+        **encode_content(content),
         "expires_at": None,
-        "password_hash": generate_password_hash(password) if password else None
+        "expires_at_epoch": None,
+        "password_hash": None
     }
+    # Single datetime call for consistency; both deadlines derive from it
+    now = _utcnow()
+
+    # The password is normally hashed after the redirect; until then the
+    # paste is viewable but edits are refused
+    if password:
+        paste["password_pending_until"] = now + timedelta(seconds=PASSWORD_PENDING_TIMEOUT)
 
     if expire_days and expire_days > 0:
         paste["expires_at"] = now + timedelta(days=expire_days)
+        paste["expires_at_epoch"] = to_epoch(paste["expires_at"])
 
-    pastes.insert_one(paste)
-    return redirect(url_for("view_paste", slug=slug))
+    await insert_paste(paste)
+    if password:
+        if len(_password_tasks) < MAX_PENDING_PASSWORD_HASHES:
+            schedule_password_hash(paste["_id"], paste["slug"], password)
+        elif not await set_password_hash(paste["_id"], paste["slug"], password):
+            await flash("Paste created, but its password could not be saved, so it cannot be edited.", "error")
+    return redirect(url_for("view_paste", slug=paste["slug"]))
 
 @app.route("/p/<slug>")
-def view_paste(slug):
-    paste = get_paste_or_404(slug)
-    return render_template("paste.html", paste=paste, base_url=BASE_URL)
+async def view_paste(slug):
+    # A page carrying flashed messages is per-user and must not be cached
+    cacheable = not session.get("_flashes")
+    response = not_modified_response(slug) if cacheable else None
+    if response is not None:
+        return response
+    paste = await get_paste_or_404(slug, "view")
+    response = await make_response(await render_template(
+        "paste.html", paste=paste, content=decode_content(paste), base_url=BASE_URL
+    ))
+    if cacheable and not paste.get("editable"):
+        expires_at_epoch = paste.get("expires_at_epoch")
+        set_immutable_headers(response, paste_etag(slug, expires_at_epoch), expires_at_epoch)
+    return response
 
 @app.route("/edit/<slug>", methods=["GET", "POST"])
-def edit_paste(slug):
-    paste = get_paste_or_404(slug)
+async def edit_paste(slug):
+    paste = await get_paste_or_404(slug, "auth" if request.method == "POST" else "full")
+    pending_until = paste.get("password_pending_until")
+    if pending_until and to_epoch(pending_until) >= _now_epoch:
+        await flash("This paste is still being set up. Try again in a moment.", "error")
+        return redirect(url_for("view_paste", slug=slug))
+    if pending_until and not paste.get("password_hash"):
+        await flash("This paste is not editable (its password could not be saved).", "error")
+        return redirect(url_for("view_paste", slug=slug))
     if not paste.get("password_hash"):
-        flash("This paste is not editable (no password was set).", "error")
+        await flash("This paste is not editable (no password was set).", "error")
         return redirect(url_for("view_paste", slug=slug))
 
     if request.method == "POST":
-        password = request.form.get("password", "")
-        if not check_password_hash(paste["password_hash"], password):
-            flash("Incorrect password.", "error")
+        form = await request.form
+        password = form.get("password", "")
+        if not await check_edit_password(slug, paste["password_hash"], password):
+            await flash("Incorrect password.", "error")
             return redirect(url_for("edit_paste", slug=slug))
 
-        new_content = request.form.get("content", "")
+        new_content = form.get("content", "")
         if not new_content.strip():
-            flash("Content cannot be empty.", "error")
+            await flash("Content cannot be empty.", "error")
             return redirect(url_for("edit_paste", slug=slug))
 
-        # Single update with all fields at once
-        pastes.update_one(
-            {"_id": paste["_id"]}, 
-            {"$set": {
-                "content": new_content,
-                "title": request.form.get("title", paste["title"]),
-                "language": request.form.get("language", paste["language"]),
-                "updated_at": datetime.utcnow()
-            }}
+        update = {
+            **encode_content(new_content),
+            "title": form.get("title", paste["title"]),
+            "language": form.get("language", paste["language"])
+        }
+        # Upgrade legacy or outdated hashes while we have the plaintext
+        if password_needs_rehash(paste["password_hash"]):
+            update["password_hash"] = await run_kdf(hash_password, password)
+
+        # Single update; editable pastes are never cached, so there is
+        # nothing to invalidate
+        updated = await pastes.find_one_and_update(
+            {"_id": paste["_id"]},
+            {"$set": update, "$currentDate": {"updated_at": True}},
+            projection={"_id": 1}
         )
-        flash("Paste updated successfully!", "success")
+        if not updated:
+            abort(404)
+        await flash("Paste updated successfully!", "success")
         return redirect(url_for("view_paste", slug=slug))
 
-    return render_template("edit.html", paste=paste)
+    return await render_template("edit.html", paste=paste, content=decode_content(paste))
 
 @app.route("/raw/<slug>")
-def raw_paste(slug):
-    paste = get_paste_or_404(slug)
-    return Response(paste["content"], mimetype="text/plain; charset=utf-8")
+async def raw_paste(slug):
+    accepts_zstd = request.accept_encodings.quality("zstd") > 0
+    # Each content encoding is a distinct representation with its own ETag
+    suffix = "-zstd" if accepts_zstd else ""
+    response = not_modified_response(slug, suffix)
+    if response is not None:
+        response.vary.add("Accept-Encoding")
+        return response
+    paste = await get_paste_or_404(slug, "raw")
+    # Send the stored zstd frame as-is when the client can decode it
+    if paste.get("encoding") == "zstd" and accepts_zstd:
+        response = Response(bytes(paste["content"]), mimetype="text/plain; charset=utf-8")
+        response.headers["Content-Encoding"] = "zstd"
+    else:
+        response = Response(decode_content(paste), mimetype="text/plain; charset=utf-8")
+        suffix = ""
+    response.vary.add("Accept-Encoding")
+    if not paste.get("editable"):
+        expires_at_epoch = paste.get("expires_at_epoch")
+        set_immutable_headers(response, paste_etag(slug, expires_at_epoch, suffix), expires_at_epoch)
+    return response
 
 @app.errorhandler(404)
-def not_found(e):
-    return render_template("404.html"), 404
+async def not_found(e):
+    return await render_template("404.html"), 404
+
+@app.errorhandler(413)
+async def too_large(e):
+    return await render_template("error.html", error="Paste is too large (limit is 1 MB)."), 413
+
+@app.errorhandler(503)
+async def unavailable(e):
+    return await render_template("error.html", error="Could not save the paste. Please try again later."), 503
 
 @app.errorhandler(ServerSelectionTimeoutError)
 @app.errorhandler(ConnectionFailure)
-def handle_db_error(e):
+async def handle_db_error(e):
     """Handle database connection errors gracefully."""
     app.logger.error(f"Database connection error: {e}")
-    return render_template("error.html", error="Database connection failed. Please try again later."), 503
+    return await render_template("error.html", error="Database connection failed. Please try again later."), 503
 
 if __name__ == "__main__":
+    # Development server only; in production run: uvicorn app:app --workers $(nproc)
     app.run(host='0.0.0.0', port=8080, debug=False)
@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+import app as paste_app
+
+
+def get(path, if_none_match, **headers):
+    async def request():
+        client = paste_app.app.test_client()
+        return await client.get(path, headers={"If-None-Match": if_none_match, **headers})
+    return asyncio.run(request())
+
+
+def test_not_modified_carries_cache_headers():
+    response = get("/raw/aaaaaaa", '"aaaaaaa"')
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"aaaaaaa"'
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_not_modified_takes_max_age_from_etag_expiry(monkeypatch):
+    now = int(time.time())
+    monkeypatch.setattr(paste_app, "_now_epoch", now)
+
+    response = get("/p/aaaaaaa", f'"aaaaaaa.{now + 60}"')
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'"aaaaaaa.{now + 60}"'
+    assert response.headers["Cache-Control"] == "public, max-age=60, immutable"
+
+
+def test_not_modified_matches_zstd_representation():
+    response = get("/raw/aaaaaaa", '"aaaaaaa-zstd"', **{"Accept-Encoding": "zstd"})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"aaaaaaa-zstd"'
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+from werkzeug.exceptions import ServiceUnavailable
+
+import app as paste_app
+
+
+class FakePastes:
+    """Stands in for the pastes collection; fails or blocks bulk_write on demand."""
+
+    def __init__(self, failures=(), gate=None):
+        self.failures = list(failures)
+        self.gate = gate
+        self.batches = []
+
+    async def bulk_write(self, requests, ordered=True):
+        self.batches.append([request._doc["$setOnInsert"]["slug"] for request in requests])
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.failures:
+            raise self.failures.pop(0)
+
+
+def new_paste(slug):
+    return {"slug": slug, "title": "", "language": ""}
+
+
+def run_with_worker(monkeypatch, pastes, test):
+    """Run test() with a fresh queue and insert worker bound to pastes."""
+    monkeypatch.setattr(paste_app, "pastes", pastes)
+    monkeypatch.setattr(paste_app, "INSERT_TIMEOUT", 1)
+
+    async def main():
+        monkeypatch.setattr(paste_app, "_insert_queue", asyncio.Queue())
+        worker = asyncio.create_task(paste_app._insert_worker())
+        monkeypatch.setattr(paste_app, "_insert_worker_task", worker)
+        try:
+            await test()
+        finally:
+            worker.cancel()
+
+    asyncio.run(main())
+
+
+def test_cancelled_insert_does_not_stop_worker(monkeypatch):
+    gate = asyncio.Event()
+    pastes = FakePastes(gate=gate)
+
+    async def test():
+        cancelled = asyncio.create_task(paste_app.insert_paste(new_paste("aaaaaaa")))
+        await asyncio.sleep(0.05)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        await paste_app.insert_paste(new_paste("bbbbbbb"))
+        assert not paste_app._insert_worker_task.done()
+
+    run_with_worker(monkeypatch, pastes, test)
+    assert pastes.batches == [["aaaaaaa"], ["bbbbbbb"]]
+
+
+def test_slug_collision_is_requeued_with_new_slug(monkeypatch):
+    collision = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}]})
+    pastes = FakePastes(failures=[collision])
+    paste = new_paste("aaaaaaa")
+
+    async def test():
+        await paste_app.insert_paste(paste)
+
+    run_with_worker(monkeypatch, pastes, test)
+    assert len(pastes.batches) == 2
+    assert pastes.batches[0] == ["aaaaaaa"]
+    assert pastes.batches[1] == [paste["slug"]] != ["aaaaaaa"]
+
+
+def test_failed_batch_does_not_stop_worker(monkeypatch):
+    pastes = FakePastes(failures=[RuntimeError("boom")])
+
+    async def test():
+        with pytest.raises(RuntimeError):
+            await paste_app.insert_paste(new_paste("aaaaaaa"))
+        await paste_app.insert_paste(new_paste("bbbbbbb"))
+
+    run_with_worker(monkeypatch, pastes, test)
+
+
+def test_insert_without_worker_aborts(monkeypatch):
+    monkeypatch.setattr(paste_app, "_insert_worker_task", None)
+
+    with pytest.raises(ServiceUnavailable):
+        asyncio.run(paste_app.insert_paste(new_paste("aaaaaaa")))
+
+
+def test_stalled_insert_times_out(monkeypatch):
+    pastes = FakePastes(gate=asyncio.Event())
+
+    async def test():
+        with pytest.raises(ServiceUnavailable):
+            await paste_app.insert_paste(new_paste("aaaaaaa"))
+
+    run_with_worker(monkeypatch, pastes, test)
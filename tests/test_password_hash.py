@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+import app as paste_app
+
+
+class FakePastes:
+    """Records update_one calls; raises queued errors first."""
+
+    def __init__(self, failures=(), matched=1):
+        self.failures = list(failures)
+        self.matched = matched
+        self.updates = []
+
+    async def update_one(self, filter, update):
+        self.updates.append(update)
+        if self.failures:
+            raise self.failures.pop(0)
+        return SimpleNamespace(matched_count=self.matched)
+
+
+def set_password(monkeypatch, pastes):
+    monkeypatch.setattr(paste_app, "pastes", pastes)
+    monkeypatch.setattr(paste_app, "PASSWORD_HASH_ATTEMPTS", 2)
+    return asyncio.run(paste_app.set_password_hash("id", "aaaaaaa", "hunter2"))
+
+
+def test_password_hash_is_retried(monkeypatch):
+    pastes = FakePastes(failures=[ConnectionError("flaky")])
+
+    assert set_password(monkeypatch, pastes)
+    stored = pastes.updates[-1]["$set"]["password_hash"]
+    assert paste_app.verify_password(stored, "hunter2")
+
+
+def test_password_hash_gives_up_and_clears_pending(monkeypatch):
+    pastes = FakePastes(failures=[ConnectionError("down")] * 2)
+
+    assert not set_password(monkeypatch, pastes)
+    assert pastes.updates[-1] == {"$unset": {"password_pending_until": ""}}
+
+
+def test_password_hash_after_deadline_is_not_stored(monkeypatch):
+    pastes = FakePastes(matched=0)
+
+    assert not set_password(monkeypatch, pastes)
+    assert len(pastes.updates) == 1
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+import app as paste_app
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    cache = paste_app.LRUCache(maxsize=4 * 1024 * 1024, getsizeof=paste_app._cached_size)
+    monkeypatch.setattr(paste_app, "_paste_cache", cache)
+
+
+def immutable_paste(size=1):
+    return {"editable": False, "content": b"x" * size}
+
+
+@pytest.mark.parametrize("paste", [
+    {"editable": True},
+    {"password_hash": "$argon2id$..."},
+    {"password_pending_until": datetime(2030, 1, 1)},
+])
+def test_editable_pastes_are_not_cached(paste):
+    paste_app.cache_paste("aaaaaaa", "view", paste)
+    assert "aaaaaaa" not in paste_app._paste_cache
+
+
+def test_immutable_pastes_are_cached():
+    paste = immutable_paste()
+    paste_app.cache_paste("aaaaaaa", "view", paste)
+    assert paste_app.cached_paste("aaaaaaa", "view") is paste
+
+
+def test_cached_view_serves_raw_but_not_the_reverse():
+    paste = immutable_paste()
+    paste_app.cache_paste("aaaaaaa", "raw", paste)
+    assert paste_app.cached_paste("aaaaaaa", "view") is None
+
+    paste_app.cache_paste("aaaaaaa", "view", paste)
+    assert paste_app.cached_paste("aaaaaaa", "raw") is paste
+    assert len(paste_app._paste_cache) == 1
+
+
+def test_edit_projections_are_not_cached():
+    paste_app.cache_paste("aaaaaaa", "full", immutable_paste())
+    assert "aaaaaaa" not in paste_app._paste_cache
+
+
+def test_large_pastes_are_not_cached():
+    paste_app.cache_paste("aaaaaaa", "view", immutable_paste(paste_app.PASTE_CACHE_MAX_ITEM))
+    assert "aaaaaaa" not in paste_app._paste_cache
+
+
+def test_cache_is_bounded_by_content_bytes():
+    for i in range(40):
+        paste_app.cache_paste(f"slug{i:03}", "view", immutable_paste(200 * 1024))
+
+    assert paste_app._paste_cache.currsize <= paste_app._paste_cache.maxsize
+    assert len(paste_app._paste_cache) < 40
+    assert "slug039" in paste_app._paste_cache